@@ -394,6 +394,7 @@ def analyze_zombies(
     user_id: str = "default-user",
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,    # Keyset pagination cursor (next_cursor of the previous page)
     db: Session = Depends(get_db)
 ):
     """
@@ -411,6 +412,7 @@ def analyze_zombies(
     - total_breakdown: Breakdown by source for ALL listings
     - zombie_count: Number of filtered zombie listings
     - zombies: List of zombie listings (paginated)
+    - next_cursor: Keyset cursor for the next page (None on the last page)
     """
     # Validate marketplace - MVP Scope: Only eBay and Shopify
     valid_marketplaces = [
@@ -527,24 +529,28 @@ def analyze_zombies(
     # Use max_watches if provided, otherwise fall back to max_watch_count
     effective_watches = max_watches if max_watches > 0 else max_watch_count
     
-    zombies, zombie_breakdown = analyze_zombie_listings(
-        db,
-        user_id=user_id,
-        min_days=effective_period,
-        max_sales=max_sales,
-        max_watch_count=effective_watches,  # Legacy param
-        max_watches=effective_watches,       # New param
-        max_impressions=max_impressions,
-        max_views=max_views,
-        supplier_filter=supplier_filter,
-        platform_filter=marketplace,
-        store_id=store_id,
-        skip=skip,
-        limit=limit
-    )
+    try:
+        zombies, zombie_breakdown, next_cursor = analyze_zombie_listings(
+            db,
+            user_id=user_id,
+            min_days=effective_period,
+            max_sales=max_sales,
+            max_watch_count=effective_watches,  # Legacy param
+            max_watches=effective_watches,       # New param
+            max_impressions=max_impressions,
+            max_views=max_views,
+            supplier_filter=supplier_filter,
+            platform_filter=marketplace,
+            store_id=store_id,
+            skip=skip,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Cache KPI metrics if this is a full page request
-    if skip == 0 and limit >= 100 and not cached_kpi:
+    if skip == 0 and cursor is None and limit >= 100 and not cached_kpi:
         kpi_data = {
             "total_count": total_count,
             "total_breakdown": total_breakdown,
@@ -558,6 +564,7 @@ def analyze_zombies(
         "platform_breakdown": platform_breakdown,
         "zombie_count": len(zombies),
         "zombie_breakdown": zombie_breakdown,  # Store-Level Breakdown
+        "next_cursor": next_cursor,  # Pass as cursor to fetch the next page
         "zombies": [
             {
                 "id": z.id,
@@ -617,7 +624,7 @@ def export_csv(
     max_watch_count = max(0, max_watch_count)
     
     # Get zombie listings with filters
-    zombies, _ = analyze_zombie_listings(
+    zombies, _, _ = analyze_zombie_listings(
         db, 
         user_id="default-user",  # Default user ID
         min_days=min_days, 
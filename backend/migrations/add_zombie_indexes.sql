@@ -0,0 +1,30 @@
+-- ============================================================
+-- OptListing - Zombie Analysis Indexes
+-- 좀비 리스팅 분석(analyze_zombie_listings) / check_global_health 성능 향상을 위한 인덱스
+-- Supabase SQL Editor에서 실행하세요
+-- ============================================================
+
+-- 참고: 등록일 필터용 인덱스는 만들지 않음
+--    좀비 필터는 services._LISTED_DATE (metrics->>'date_listed' 의 ::date / to_timestamp CASE)
+--    로 비교/정렬하는데, 이 캐스트는 IMMUTABLE 이 아니라서 표현식 인덱스로 만들 수 없고,
+--    date_listed < cutoff 는 JSONB 분기와 OR 로 묶여 있어 컬럼 인덱스도 쓰이지 않음.
+--    user_id + platform 필터는 fix_jsonb_queries.sql 의 idx_listings_user_platform 이 이미 처리함.
+
+-- 1. 복합 인덱스: user_id + supplier_id (글로벌 승자 / 크로스 플랫폼 활동 조회)
+--    두 조회 모두 metrics(JSONB)를 읽어서 index-only scan 이 불가능하므로 INCLUDE 컬럼은 두지 않음.
+--    add_supplier_indexes.sql 의 idx_listings_user_supplier (user_id, supplier_name) 와는 별개.
+--    models.Listing.__table_args__ 의 idx_listings_user_supplier_id 와 동일하게 유지할 것.
+CREATE INDEX IF NOT EXISTS idx_listings_user_supplier_id 
+ON listings (user_id, supplier_id) 
+WHERE supplier_id IS NOT NULL;
+
+-- 2. 확장 통계: user_id 와 platform 의 상관관계 (사용자별 플랫폼 필터 행 수 추정 개선)
+CREATE STATISTICS IF NOT EXISTS stx_listings_user_platform (dependencies, ndistinct)
+ON user_id, platform FROM listings;
+
+ANALYZE listings;
+
+-- ============================================================
+-- 통계 정보
+-- ============================================================
+COMMENT ON INDEX idx_listings_user_supplier_id IS '좀비 분석 - 공급처별 글로벌 판매 / 크로스 플랫폼 조회';
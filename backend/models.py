@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, create_engine
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, Index, create_engine
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -9,6 +9,17 @@ from datetime import date, datetime
 # Load environment variables from .env file
 load_dotenv()
 
+# orjson (선택): JSONB 컬럼(metrics, analysis_meta) 직렬화/역직렬화 가속
+try:
+    import orjson
+
+    def _json_serializer(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    _JSON_ENGINE_KWARGS = {"json_serializer": _json_serializer, "json_deserializer": orjson.loads}
+except ImportError:
+    _JSON_ENGINE_KWARGS = {}
+
 Base = declarative_base()
 
 
@@ -43,6 +54,19 @@ class Listing(Base):
     is_zombie = Column(Boolean, default=False, nullable=True)
     zombie_score = Column(Float, nullable=True)
 
+    __table_args__ = (
+        # upsert_listings 의 ON CONFLICT 대상 (user_id, platform, item_id)
+        Index("idx_user_platform_item", "user_id", "platform", "item_id", unique=True),
+        # 글로벌 승자 / 크로스 플랫폼 활동 조회용 (user_id, supplier_id) 인덱스 (migrations/add_zombie_indexes.sql)
+        # 두 조회 모두 metrics(JSONB)를 읽으므로 index-only scan 이 불가능 -> INCLUDE 컬럼 없음
+        Index(
+            "idx_listings_user_supplier_id",
+            "user_id",
+            "supplier_id",
+            postgresql_where=supplier_id.isnot(None),
+        ),
+    )
+
     def __repr__(self):
         return f"<Listing(ebay_item_id={self.ebay_item_id}, title={self.title}, source={self.source})>"
 
@@ -56,6 +80,7 @@ class DeletionLog(Base):
     platform = Column(String, nullable=True)  # marketplace: "eBay", "Amazon", "Shopify", "Walmart"
     source = Column(String, nullable=False)  # "Amazon", "Walmart", etc.
     deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    snapshot = Column(JSONB, default={}, nullable=True)  # 삭제 시점의 스냅샷 (supabase_schema.sql)
 
     def __repr__(self):
         return f"<DeletionLog(item_id={self.item_id}, title={self.title}, deleted_at={self.deleted_at})>"
@@ -120,7 +145,8 @@ if DATABASE_URL and DATABASE_URL.startswith(("postgresql://", "postgres://")):
             SQLALCHEMY_DATABASE_URL,
             pool_pre_ping=True,  # Verify connections before using them
             pool_size=5,
-            max_overflow=10
+            max_overflow=10,
+            **_JSON_ENGINE_KWARGS
         )
     except Exception as e:
         # ✅ FIX: DATABASE_URL 파싱 실패 시 SQLite로 폴백
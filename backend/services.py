@@ -1,13 +1,166 @@
 from datetime import date, timedelta, datetime
-from typing import List, Optional, Dict, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, cast, Integer, String, Date, case, func
+from typing import List, Optional, Dict, Tuple, IO
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, or_, bindparam, cast, Integer, Numeric, String, Date, case, func, literal_column
 from sqlalchemy.dialects.postgresql import insert, JSONB
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from .models import Listing, DeletionLog
-import pandas as pd
 from io import StringIO
 import re
 import json
+import csv
+import os
+import threading
+from functools import lru_cache, partial
+from collections import namedtuple, defaultdict
+from operator import attrgetter
+from itertools import chain, islice, repeat
+
+# orjson (선택): raw_data JSON 문자열 파싱 가속, 없으면 표준 json 사용
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+# Supplier detection only depends on the SKU and image URL, so results are memoized per
+# normalized (sku_upper, image_url_lower).
+# Set OPTLISTING_SUPPLIER_CACHE=0 to disable (e.g. in unit tests).
+_SUPPLIER_CACHE_ENABLED = os.getenv("OPTLISTING_SUPPLIER_CACHE", "1").strip() != "0"
+_SUPPLIER_CACHE_SIZE = 131072
+
+# Storage format of metrics['date_listed']: "string" (date text), "number" (unix timestamp)
+# or "auto" (mixed - dispatch on jsonb_typeof per row). Deployments that write a single
+# format can pin it with OPTLISTING_METRICS_DATE_FORMAT to drop the per-row type dispatch.
+_METRICS_DATE_FORMAT = os.getenv("OPTLISTING_METRICS_DATE_FORMAT", "auto").strip().lower()
+
+# Optional Listing columns (added via migrations) - resolved once at import time
+_HAS_STORE_ID = hasattr(Listing, 'store_id')
+_HAS_GLOBAL_WINNER = hasattr(Listing, 'is_global_winner')
+_HAS_ACTIVE_ELSEWHERE = hasattr(Listing, 'is_active_elsewhere')
+_HAS_ZOMBIE_FLAGS = _HAS_GLOBAL_WINNER or _HAS_ACTIVE_ELSEWHERE
+# ✅ FIX: platform 필드가 없으면 marketplace 사용, item_id가 없으면 ebay_item_id 사용
+_PLATFORM_COLUMN = Listing.platform if hasattr(Listing, 'platform') else Listing.marketplace
+_ITEM_ID_COLUMN = Listing.item_id if hasattr(Listing, 'item_id') else Listing.ebay_item_id
+
+# Amazon ASIN format: B0 + 8 alphanumeric (compiled once, used per classification)
+_ASIN_RE = re.compile(r'B0[0-9A-Z]{8}')
+
+# Supplier priority after Amazon: when the SKU prefix and the image URL point at
+# different suppliers, the one listed first wins
+_SUPPLIER_PRIORITY = (
+    "Walmart",
+    "AliExpress",
+    "CJ Dropshipping",
+    "Home Depot",
+    "Wayfair",
+    "Costco",
+    "Costway",
+    "Wholesale2B",
+    "Spocket",
+    "SaleHoo",
+    "Inventory Source",
+    "Dropified",
+)
+_SUPPLIER_RANK = {name: rank for rank, name in enumerate(_SUPPLIER_PRIORITY)}
+
+# SKU prefix -> supplier. Prefixes are 2 or 3 characters and prefix-free, so a lookup
+# on the SKU's leading 3 characters, then its leading 2, finds the only possible match
+_SKU_PREFIX_SUPPLIERS = {
+    "WM": "Walmart",
+    "AE": "AliExpress",
+    "ALI": "AliExpress",
+    "CJ": "CJ Dropshipping",
+    "HD": "Home Depot",
+    "WF": "Wayfair",
+    "CO": "Costco",
+    "CW": "Costway",
+    "W2B": "Wholesale2B",
+    "SPK": "Spocket",
+    "SH": "SaleHoo",
+    "IS": "Inventory Source",
+    "DF": "Dropified",
+}
+
+# Image URL domain tokens -> supplier
+_URL_SUPPLIER_TOKENS = {
+    "walmart": "Walmart",
+    "aliexpress": "AliExpress",
+    "alicdn": "AliExpress",
+    "cjdropshipping": "CJ Dropshipping",
+    "homedepot": "Home Depot",
+    "wayfair": "Wayfair",
+    "costco": "Costco",
+    "costway": "Costway",
+    "wholesale2b": "Wholesale2B",
+    "spocket": "Spocket",
+    "salehoo": "SaleHoo",
+    "inventorysource": "Inventory Source",
+    "dropified": "Dropified",
+}
+# One pass over the URL finds every token (lookahead so overlapping tokens are not skipped)
+_URL_SUPPLIER_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, _URL_SUPPLIER_TOKENS)) + "))"
+)
+
+
+def _url_supplier(image_url_lower: str) -> Optional[str]:
+    """Highest-priority supplier whose domain token appears in a lower-cased image URL"""
+    best = None
+    for match in _URL_SUPPLIER_RE.finditer(image_url_lower):
+        name = _URL_SUPPLIER_TOKENS[match.group(1)]
+        if best is None or _SUPPLIER_RANK[name] < _SUPPLIER_RANK[best]:
+            best = name
+    return best
+
+
+def _classify_supplier(sku_upper: str, image_url_lower: str) -> Tuple[str, Optional[str]]:
+    """extract_supplier_info on normalized input (upper-cased SKU, lower-cased image URL)"""
+    if not sku_upper:
+        # Fast path: without a SKU only the image URL can identify the supplier
+        url_supplier = _url_supplier(image_url_lower) if image_url_lower else None
+        return (url_supplier or "Unverified", None)
+    
+    # Amazon Detection
+    # Pattern 1: SKU contains "B0" (ASIN pattern) -> the ASIN is the supplier ID
+    # (searched once; the match is reused for the ID)
+    asin_match = _ASIN_RE.search(sku_upper)
+    if asin_match:
+        return ("Amazon", asin_match.group(0))
+    
+    # Pattern 2: SKU starts with "AMZ"
+    # (an embedded ASIN such as "AMZ-B08ABC1234" was already caught by the search above,
+    #  so whatever follows the prefix is the supplier ID)
+    if sku_upper.startswith("AMZ"):
+        return ("Amazon", sku_upper[3:].strip("-") or None)
+    
+    # Amazon is SKU-only; scan the URL only once a URL check can be reached
+    url_supplier = _url_supplier(image_url_lower) if image_url_lower else None
+    
+    # Other suppliers: SKU prefix (e.g. "WM-123") or image URL domain, by supplier priority
+    prefix = sku_upper[:3]
+    supplier_name = _SKU_PREFIX_SUPPLIERS.get(prefix)
+    if supplier_name is None:
+        prefix = sku_upper[:2]
+        supplier_name = _SKU_PREFIX_SUPPLIERS.get(prefix)
+    if supplier_name and (url_supplier is None or _SUPPLIER_RANK[supplier_name] <= _SUPPLIER_RANK[url_supplier]):
+        # Supplier ID is whatever follows the prefix (e.g. "WM-123" -> "123")
+        return (supplier_name, sku_upper[len(prefix):].strip("-").strip() or None)
+    
+    if url_supplier:
+        return (url_supplier, None)
+    
+    # Fallback: Unverified
+    return ("Unverified", None)
+
+
+if _SUPPLIER_CACHE_ENABLED:
+    # Resync re-submits the same SKUs/URLs daily; bounded LRU keeps memory capped.
+    # Keyed on the normalized SKU/URL only, so title/brand/case differences still hit.
+    # _classify_supplier.cache_clear() resets it.
+    _classify_supplier = lru_cache(maxsize=_SUPPLIER_CACHE_SIZE)(_classify_supplier)
 
 
 def extract_supplier_info(
@@ -30,100 +183,7 @@ def extract_supplier_info(
     - AliExpress/Others: Regex matching logic
     - Fallback: If unknown, set supplier_name="Unverified"
     """
-    sku_upper = sku.upper() if sku else ""
-    image_url_lower = image_url.lower() if image_url else ""
-    title_lower = title.lower() if title else ""
-    brand_lower = brand.lower() if brand else ""
-    
-    # Amazon Detection
-    # Pattern 1: SKU starts with "AMZ" or contains "B0" (ASIN pattern)
-    amazon_asin_pattern = r'B0[0-9A-Z]{8}'  # ASIN format: B + 9 alphanumeric
-    if sku_upper.startswith("AMZ") or re.search(amazon_asin_pattern, sku_upper):
-        # Extract ASIN
-        asin_match = re.search(amazon_asin_pattern, sku_upper)
-        if asin_match:
-            supplier_id = asin_match.group(0)
-        elif sku_upper.startswith("AMZ"):
-            # Try to extract ASIN from SKU (e.g., "AMZ-B08ABC1234")
-            parts = sku_upper.split("-")
-            for part in parts:
-                if re.match(amazon_asin_pattern, part):
-                    supplier_id = part
-                    break
-            else:
-                supplier_id = sku_upper.replace("AMZ", "").strip("-")
-        else:
-            supplier_id = None
-        return ("Amazon", supplier_id)
-    
-    # Walmart Detection
-    if sku_upper.startswith("WM") or "WALMART" in image_url_lower:
-        # Extract Walmart ID (usually after "WM-" prefix)
-        if sku_upper.startswith("WM"):
-            walmart_id = sku_upper.replace("WM", "").strip("-").strip()
-            supplier_id = walmart_id if walmart_id else None
-        else:
-            supplier_id = None
-        return ("Walmart", supplier_id)
-    
-    # AliExpress Detection
-    if sku_upper.startswith("AE") or sku_upper.startswith("ALI") or "aliexpress" in image_url_lower or "alicdn" in image_url_lower:
-        # Extract AliExpress product ID
-        if sku_upper.startswith("AE") or sku_upper.startswith("ALI"):
-            ali_id = sku_upper.replace("AE", "").replace("ALI", "").strip("-").strip()
-            supplier_id = ali_id if ali_id else None
-        else:
-            supplier_id = None
-        return ("AliExpress", supplier_id)
-    
-    # CJ Dropshipping
-    if sku_upper.startswith("CJ") or "cjdropshipping" in image_url_lower:
-        cj_id = sku_upper.replace("CJ", "").strip("-").strip() if sku_upper.startswith("CJ") else None
-        return ("CJ Dropshipping", cj_id)
-    
-    # Home Depot
-    if sku_upper.startswith("HD") or "homedepot" in image_url_lower:
-        hd_id = sku_upper.replace("HD", "").strip("-").strip() if sku_upper.startswith("HD") else None
-        return ("Home Depot", hd_id)
-    
-    # Wayfair
-    if sku_upper.startswith("WF") or "wayfair" in image_url_lower:
-        wf_id = sku_upper.replace("WF", "").strip("-").strip() if sku_upper.startswith("WF") else None
-        return ("Wayfair", wf_id)
-    
-    # Costco
-    if sku_upper.startswith("CO") or "costco" in image_url_lower:
-        co_id = sku_upper.replace("CO", "").strip("-").strip() if sku_upper.startswith("CO") else None
-        return ("Costco", co_id)
-    
-    # Costway
-    if sku_upper.startswith("CW") or "costway" in image_url_lower:
-        cw_id = sku_upper.replace("CW", "").strip("-").strip() if sku_upper.startswith("CW") else None
-        return ("Costway", cw_id)
-    
-    # Pro Aggregators
-    if sku_upper.startswith("W2B") or "wholesale2b" in image_url_lower:
-        w2b_id = sku_upper.replace("W2B", "").strip("-").strip() if sku_upper.startswith("W2B") else None
-        return ("Wholesale2B", w2b_id)
-    
-    if sku_upper.startswith("SPK") or "spocket" in image_url_lower:
-        spk_id = sku_upper.replace("SPK", "").strip("-").strip() if sku_upper.startswith("SPK") else None
-        return ("Spocket", spk_id)
-    
-    if sku_upper.startswith("SH") or "salehoo" in image_url_lower:
-        sh_id = sku_upper.replace("SH", "").strip("-").strip() if sku_upper.startswith("SH") else None
-        return ("SaleHoo", sh_id)
-    
-    if sku_upper.startswith("IS") or "inventorysource" in image_url_lower:
-        is_id = sku_upper.replace("IS", "").strip("-").strip() if sku_upper.startswith("IS") else None
-        return ("Inventory Source", is_id)
-    
-    if sku_upper.startswith("DF") or "dropified" in image_url_lower:
-        df_id = sku_upper.replace("DF", "").strip("-").strip() if sku_upper.startswith("DF") else None
-        return ("Dropified", df_id)
-    
-    # Fallback: Unverified
-    return ("Unverified", None)
+    return _classify_supplier(sku.upper() if sku else "", image_url.lower() if image_url else "")
 
 
 def detect_source(
@@ -141,101 +201,18 @@ def detect_source(
     # Return with confidence level for backward compatibility
     confidence = "High" if supplier_name != "Unverified" else "Low"
     return (supplier_name, confidence)
-    """
-    Advanced Source Detection with Forensic Analysis
-    Uses multiple data points to identify source with confidence scoring.
-    
-    Detection Methods (in priority order):
-    1. Exclusive Brand/Keyword Match (HIGH confidence)
-    2. SKU Prefix Match (HIGH confidence)
-    3. UPC/EAN Prefix Match (HIGH confidence)
-    4. Image URL Domain Match (MEDIUM confidence)
-    
-    Returns: (source, confidence_level)
-    - source: Detected source name or "Unverified"
-    - confidence_level: "High", "Medium", "Low"
-    """
-    image_url_lower = image_url.lower() if image_url else ""
-    sku_upper = sku.upper() if sku else ""
-    title_lower = title.lower() if title else ""
-    brand_lower = brand.lower() if brand else ""
-    upc_str = upc.strip() if upc else ""
-    
-    # Exclusive Brand/Keyword Dictionary (HIGH confidence indicators)
-    exclusive_brands = {
-        "Walmart": ["mainstays", "great value", "equate", "pen+gear", "pen & gear", "hyper tough"],
-        "Costco": ["kirkland", "kirkland signature"],
-        "Amazon": ["amazonbasics", "solimo", "happy belly"],
-        "Home Depot": ["husky", "hdx", "glacier bay"],
-        "Wayfair": ["wayfair basics", "mercury row"]
-    }
-    
-    # SKU Prefix Patterns (HIGH confidence)
-    sku_patterns = {
-        "Amazon": ["AMZ"],
-        "Walmart": ["WM"],
-        "AliExpress": ["AE", "ALI"],
-        "CJ Dropshipping": ["CJ"],
-        "Home Depot": ["HD"],
-        "Wayfair": ["WF"],
-        "Costco": ["CO"],
-        "Wholesale2B": ["W2B"],
-        "Spocket": ["SPK"],
-        "SaleHoo": ["SH"],
-        "Inventory Source": ["IS"],
-        "Dropified": ["DF"]
-    }
-    
-    # UPC/EAN Prefix Patterns (HIGH confidence)
-    # Real implementation would query UPC database
-    upc_patterns = {
-        "Walmart": ["681131"],  # Walmart UPC prefix
-        # Add more UPC prefixes as needed
-    }
-    
-    # Image URL Domain Patterns (MEDIUM confidence)
-    url_patterns = {
-        "Amazon": ["amazon", "ssl-images-amazon"],
-        "Walmart": ["walmart", "walmartimages"],
-        "AliExpress": ["alicdn", "aliexpress"],
-        "CJ Dropshipping": ["cjdropshipping"],
-        "Home Depot": ["homedepot"],
-        "Wayfair": ["wayfair"],
-        "Costco": ["costco"],
-        "Wholesale2B": ["wholesale2b"],
-        "Spocket": ["spocket"],
-        "SaleHoo": ["salehoo"],
-        "Inventory Source": ["inventorysource"],
-        "Dropified": ["dropified"]
-    }
-    
-    # Priority 1: Check Exclusive Brands/Keywords (HIGH confidence)
-    # Check both title and brand field
-    search_text = f"{title_lower} {brand_lower}".strip()
-    for source, keywords in exclusive_brands.items():
-        for keyword in keywords:
-            if keyword in search_text:
-                return (source, "High")
-    
-    # Priority 2: Check SKU Prefix (HIGH confidence)
-    for source, prefixes in sku_patterns.items():
-        if any(sku_upper.startswith(prefix) for prefix in prefixes):
-            return (source, "High")
-    
-    # Priority 3: Check UPC/EAN Prefix (HIGH confidence)
-    if upc_str:
-        for source, prefixes in upc_patterns.items():
-            if any(upc_str.startswith(prefix) for prefix in prefixes):
-                return (source, "High")
-    
-    # Priority 4: Check Image URL Domain (MEDIUM confidence)
-    if image_url_lower:
-        for source, keywords in url_patterns.items():
-            if any(keyword in image_url_lower for keyword in keywords):
-                return (source, "Medium")
-    
-    # No match found -> Unverified (LOW confidence)
-    return ("Unverified", "Low")
+
+
+# Sales counted toward a supplier's global total: metrics['sales'] when it is a number,
+# 0 when the key holds anything else, legacy sold_qty when the key is missing
+_LISTING_SALES = case(
+    (
+        func.jsonb_typeof(Listing.metrics['sales']) == 'number',
+        cast(func.trunc(cast(Listing.metrics['sales'].astext, Numeric)), Integer)
+    ),
+    (Listing.metrics.has_key('sales'), 0),
+    else_=func.coalesce(Listing.sold_qty, 0)
+)
 
 
 def check_global_health(
@@ -262,33 +239,286 @@ def check_global_health(
         - Sum sales volume for the given supplier_id across ALL stores/platforms for this user
         - If total sales > 20 (threshold), return True (Global Winner)
         - Uses metrics['sales'] or legacy sold_qty field
+        - The (user_id, supplier_id) lookup uses the idx_listings_user_supplier_id index
+          (see models.Listing / migrations/add_zombie_indexes.sql)
     """
     if not supplier_id:
         return False
     
-    # Query all listings for this user with matching supplier_id across ALL stores/platforms
-    query = db.query(Listing).filter(
+    # Sum sales across all listings for this supplier_id across ALL stores/platforms,
+    # in the database (metrics['sales'] first, then fallback to sold_qty)
+    total_sales = db.query(
+        func.coalesce(func.sum(_LISTING_SALES), 0)
+    ).filter(
         Listing.user_id == user_id,
         Listing.supplier_id == supplier_id
-    )
-    
-    all_listings = query.all()
-    
-    # Sum sales across all listings for this supplier_id
-    total_sales = 0
-    for listing in all_listings:
-        # Try metrics['sales'] first, then fallback to sold_qty
-        if listing.metrics and isinstance(listing.metrics, dict) and 'sales' in listing.metrics:
-            sales = listing.metrics.get('sales', 0)
-            if isinstance(sales, (int, float)):
-                total_sales += int(sales)
-        elif hasattr(listing, 'sold_qty') and listing.sold_qty:
-            total_sales += listing.sold_qty or 0
+    ).scalar()
     
     # Threshold: 20 sales across all platforms = Global Winner
     return total_sales > 20
 
 
+# Columns read by analyze_zombie_listings and its callers (API response, CSV export).
+# Everything else (analysis_meta JSONB, brand, upc, ...) stays deferred.
+_ZOMBIE_LOAD_COLUMNS = (
+    Listing.id,
+    Listing.item_id,
+    Listing.ebay_item_id,
+    Listing.title,
+    Listing.sku,
+    Listing.image_url,
+    Listing.platform,
+    Listing.marketplace,
+    Listing.supplier_id,
+    Listing.supplier_name,
+    Listing.price,
+    Listing.metrics,
+    Listing.date_listed,
+    Listing.last_synced_at,
+    Listing.sold_qty,
+    Listing.watch_count,
+)
+
+
+# metrics['date_listed'] -> date, per JSONB storage type
+_METRICS_DATE_VALUE = Listing.metrics['date_listed']
+_METRICS_DATE_CASTS = {
+    'string': cast(_METRICS_DATE_VALUE.astext, Date),
+    'number': cast(func.to_timestamp(cast(_METRICS_DATE_VALUE.astext, Integer)), Date),
+}
+if _METRICS_DATE_FORMAT in _METRICS_DATE_CASTS:
+    # Single known format: cast directly, no jsonb_typeof check per row
+    _METRICS_DATE_BRANCHES = (
+        (_METRICS_DATE_VALUE.astext.isnot(None), _METRICS_DATE_CASTS[_METRICS_DATE_FORMAT]),
+    )
+elif _METRICS_DATE_FORMAT == "auto":
+    # ✅ FIX: jsonb_typeof으로 타입 확인 후 안전하게 추출 (문자열 / 숫자(타임스탬프))
+    _METRICS_DATE_BRANCHES = tuple(
+        (func.jsonb_typeof(_METRICS_DATE_VALUE) == json_type, date_expr)
+        for json_type, date_expr in _METRICS_DATE_CASTS.items()
+    )
+else:
+    raise ValueError(
+        f"Invalid OPTLISTING_METRICS_DATE_FORMAT: {_METRICS_DATE_FORMAT!r}. "
+        f"Must be one of: auto, {', '.join(_METRICS_DATE_CASTS)}"
+    )
+
+# Effective listing date: metrics['date_listed'] (date string or unix timestamp),
+# falling back to the date_listed column and then last_synced_at
+_LISTED_DATE = case(
+    *_METRICS_DATE_BRANCHES,
+    else_=func.coalesce(Listing.date_listed, cast(Listing.last_synced_at, Date))
+)
+
+# Platform used for the zombie breakdown (platform 필드가 없으면 marketplace 사용)
+_ZOMBIE_PLATFORM = func.coalesce(Listing.platform, Listing.marketplace, "Unknown")
+
+
+# Zombie filter expressions, built once at import; analyze_zombie_listings only binds
+# the per-request cutoff date / thresholds
+_CUTOFF_DATE = bindparam("cutoff_date", type_=Date)
+_NO_METRICS_DATE = or_(
+    Listing.metrics == None,
+    ~Listing.metrics.has_key('date_listed')
+)
+
+# Date filter: use metrics['date_listed'] (JSONB) or fallback to date_listed/last_synced_at
+# ✅ FIX: JSONB 연산자 안전하게 처리 및 NULL 체크 강화
+_ZOMBIE_DATE_FILTER = or_(
+    # Use metrics JSONB if available (안전한 방식)
+    and_(
+        Listing.metrics.isnot(None),
+        Listing.metrics.has_key('date_listed'),
+        or_(*(
+            and_(guard, date_expr < _CUTOFF_DATE)
+            for guard, date_expr in _METRICS_DATE_BRANCHES
+        ))
+    ),
+    # Fallback to date_listed column (legacy support)
+    and_(
+        _NO_METRICS_DATE,
+        Listing.date_listed.isnot(None),
+        Listing.date_listed < _CUTOFF_DATE
+    ),
+    # last_synced_at as final fallback
+    and_(
+        _NO_METRICS_DATE,
+        Listing.date_listed.is_(None),
+        Listing.last_synced_at.isnot(None),
+        func.date(Listing.last_synced_at) < _CUTOFF_DATE
+    )
+)
+
+
+def _zombie_metric(key: str, nested_key: Optional[str] = None, default=0):
+    """
+    Integer metric from metrics JSONB: metrics[key][nested_key] (nested object) or
+    metrics[key] (number/string), else `default`
+    ✅ FIX: jsonb_typeof 타입 검증 + NULL 체크 후 안전한 캐스팅
+    """
+    whens = []
+    if nested_key:
+        # Try nested structure first
+        whens.append((
+            and_(
+                Listing.metrics.isnot(None),
+                Listing.metrics.has_key(key),
+                func.jsonb_typeof(Listing.metrics[key]) == 'object',
+                Listing.metrics[key].has_key(nested_key)
+            ),
+            cast(Listing.metrics[key][nested_key].astext, Integer)
+        ))
+    # Then try flat structure
+    whens.append((
+        and_(
+            Listing.metrics.isnot(None),
+            Listing.metrics.has_key(key),
+            func.jsonb_typeof(Listing.metrics[key]).in_(['number', 'string']),
+            Listing.metrics[key].astext.isnot(None)
+        ),
+        cast(Listing.metrics[key].astext, Integer)
+    ))
+    return case(*whens, else_=default)
+
+
+_ZOMBIE_SALES = _zombie_metric('sales')
+# Fallback to legacy watch_count column
+_ZOMBIE_WATCHES = _zombie_metric('watches', 'total_watches', func.coalesce(Listing.watch_count, 0))
+_ZOMBIE_IMPRESSIONS = _zombie_metric('impressions', 'total_impressions')
+_ZOMBIE_VIEWS = _zombie_metric('views', 'total_views')
+
+
+# Activity check ("not a zombie": Sales > 0 OR Views > 10 OR Age < 3 days) evaluated in SQL.
+# A non-empty metrics object supplies sales/views/date_listed (non-numeric values count as 0,
+# a missing or non-date date_listed falls back to last_synced_at); otherwise the legacy
+# sold_qty / watch_count / date_listed columns are used.
+_HAS_METRICS = and_(
+    func.jsonb_typeof(Listing.metrics) == 'object',
+    Listing.metrics != literal_column("'{}'::jsonb")
+)
+
+
+def _metrics_number(key: str):
+    return case(
+        (func.jsonb_typeof(Listing.metrics[key]) == 'number', cast(Listing.metrics[key].astext, Numeric)),
+        else_=0
+    )
+
+
+_ACTIVITY_SALES = case((_HAS_METRICS, _metrics_number('sales')), else_=func.coalesce(Listing.sold_qty, 0))
+_ACTIVITY_VIEWS = case((_HAS_METRICS, _metrics_number('views')), else_=func.coalesce(Listing.watch_count, 0))
+_ACTIVITY_DATE = func.coalesce(
+    case(
+        (
+            and_(
+                _HAS_METRICS,
+                func.jsonb_typeof(Listing.metrics['date_listed']) == 'string',
+                Listing.metrics['date_listed'].astext.op('~')(r'^\d{4}-\d{1,2}-\d{1,2}$')
+            ),
+            cast(Listing.metrics['date_listed'].astext, Date)
+        ),
+        (_HAS_METRICS, None),
+        else_=Listing.date_listed
+    ),
+    cast(Listing.last_synced_at, Date)
+)
+
+
+def _format_zombie_cursor(listed_date: Optional[date], listing_id: int) -> str:
+    """Keyset cursor "<YYYY-MM-DD>:<id>" (":<id>" for undated listings)"""
+    return f"{listed_date.isoformat() if listed_date else ''}:{listing_id}"
+
+
+def _parse_zombie_cursor(cursor: str) -> Tuple[Optional[date], int]:
+    """Inverse of _format_zombie_cursor; raises ValueError for a malformed cursor"""
+    date_part, sep, id_part = cursor.rpartition(':')
+    try:
+        if not sep:
+            raise ValueError
+        return (date.fromisoformat(date_part) if date_part else None), int(id_part)
+    except ValueError:
+        raise ValueError(f"Invalid zombie cursor: {cursor!r}") from None
+
+
+def _apply_zombie_flags(db: Session, user_id: str, zombies: List[Listing]) -> None:
+    """
+    Set is_global_winner / is_active_elsewhere on a page of zombies, write them back in one
+    batched UPDATE, and move active-elsewhere zombies to the front (in place)
+    """
+    # Cross-Platform Health Check & Activity Check for the whole page in ONE grouped query:
+    # per (supplier_id, platform) total sales and whether any listing there is still active
+    supplier_ids = {zombie.supplier_id for zombie in zombies if zombie.supplier_id}
+    global_sales = defaultdict(int)
+    active_platforms = defaultdict(set)
+    if supplier_ids:
+        recent_cutoff = date.today() - timedelta(days=3)
+        is_active = or_(
+            _ACTIVITY_SALES > 0,
+            _ACTIVITY_VIEWS > 10,
+            _ACTIVITY_DATE > recent_cutoff
+        )
+        supplier_rows = db.query(
+            Listing.supplier_id,
+            _PLATFORM_COLUMN,
+            func.sum(_LISTING_SALES),
+            func.bool_or(is_active)
+        ).filter(
+            Listing.user_id == user_id,
+            Listing.supplier_id.in_(supplier_ids)
+        ).group_by(Listing.supplier_id, _PLATFORM_COLUMN).all()
+        
+        for supplier_id, platform, sales, any_active in supplier_rows:
+            # Global total spans ALL stores/platforms for this user
+            global_sales[supplier_id] += sales or 0
+            if platform is not None and any_active:
+                active_platforms[supplier_id].add(platform)
+    
+    # Flag values are collected per zombie and written back in one bulk UPDATE below;
+    # set_committed_value keeps the loaded objects in sync without marking them dirty
+    flag_updates = []
+    for zombie in zombies:
+        flags = {}
+        
+        # Global winner: this supplier_id sold more than 20 across all stores
+        is_global_winner = global_sales.get(zombie.supplier_id, 0) > 20
+        
+        # Set the is_global_winner flag (safe: check if column exists)
+        if _HAS_GLOBAL_WINNER:
+            flags['is_global_winner'] = 1 if is_global_winner else 0
+        
+        # Cross-Platform Activity Check: is any listing of the same supplier_id
+        # on a DIFFERENT platform/store still active?
+        # ✅ FIX: platform 필드가 없으면 marketplace 사용
+        zombie_platform = getattr(zombie, 'platform', None) or getattr(zombie, 'marketplace', None)
+        is_active_elsewhere = any(
+            platform != zombie_platform
+            for platform in active_platforms.get(zombie.supplier_id, ())
+        )
+        
+        # Set the is_active_elsewhere flag (safe: check if column exists)
+        if _HAS_ACTIVE_ELSEWHERE:
+            flags['is_active_elsewhere'] = 1 if is_active_elsewhere else 0
+        
+        if flags:
+            for key, value in flags.items():
+                set_committed_value(zombie, key, value)
+            flags['id'] = zombie.id
+            flag_updates.append(flags)
+    
+    # Write all flag updates in one batched UPDATE and commit once (only if columns exist)
+    if flag_updates:
+        try:
+            db.bulk_update_mappings(Listing, flag_updates)
+            db.commit()
+        except Exception as e:
+            # If commit fails due to missing columns, rollback and continue
+            db.rollback()
+            print(f"Warning: Could not update flags (columns may not exist): {e}")
+    
+    # Active-elsewhere zombies first; stable sort keeps the SQL date order within each group
+    zombies.sort(key=lambda z: -getattr(z, 'is_active_elsewhere', 0))
+
+
 def analyze_zombie_listings(
     db: Session,
     user_id: str,
@@ -302,8 +532,9 @@ def analyze_zombie_listings(
     platform_filter: str = "eBay",   # MVP Scope: Default to eBay (only eBay and Shopify supported)
     store_id: Optional[str] = None,
     skip: int = 0,                   # Pagination: skip N records
-    limit: int = 100                 # Pagination: limit to N records
-) -> Tuple[List[Listing], Dict[str, int]]:
+    limit: int = 100,                # Pagination: limit to N records
+    cursor: Optional[str] = None     # Keyset pagination: next_cursor of the previous page (overrides skip)
+) -> Tuple[List[Listing], Dict[str, int], Optional[str]]:
     """
     OptListing 최종 좀비 분석 필터
     순서: 판매(Sales) → 관심(Watch) → 트래픽(Traffic)
@@ -321,9 +552,16 @@ def analyze_zombie_listings(
     - metrics['impressions']['total_impressions'] or metrics['impressions']
     - metrics['views']['total_views'] or metrics['views']
     
+    Pagination:
+    - cursor: opaque keyset cursor (next_cursor of the previous page) encoding the
+      (listed date, id) of the last row returned; the next page filters past it
+      instead of offsetting. skip is ignored when set. Raises ValueError if malformed.
+    
     Returns:
-        Tuple of (list of zombie listings, breakdown dictionary by platform)
-        Example: ([Listing, ...], {"eBay": 150, "Shopify": 23})
+        Tuple of (list of zombie listings for the requested page,
+                  breakdown dictionary by platform over all matching zombies,
+                  next_cursor for the following page or None on the last page)
+        Example: ([Listing, ...], {"eBay": 150, "Shopify": 23}, "2024-03-01:4821")
     """
     # Ensure values are non-negative
     min_days = max(0, min_days)
@@ -346,197 +584,78 @@ def analyze_zombie_listings(
         # Note: Assuming there's a store_id column in Listing model
         # If not, this will need to be adjusted based on actual schema
         # For now, we'll skip this filter if store_id column doesn't exist
-        if hasattr(Listing, 'store_id'):
+        if _HAS_STORE_ID:
             query = query.filter(Listing.store_id == store_id)
     # If store_id is 'all' or None, DO NOT filter by store (return all for user)
     
     # Date filter: use metrics['date_listed'] (JSONB) or fallback to date_listed/last_synced_at
-    # ✅ FIX: JSONB 연산자 안전하게 처리 및 NULL 체크 강화
-    date_filters = []
-    
-    # Use metrics JSONB if available (안전한 방식)
-    # ✅ FIX: hasattr 제거 (SQL 쿼리 레벨에서 의미 없음), NULL 체크 강화
-    date_filters.append(
-        and_(
-            Listing.metrics.isnot(None),
-            Listing.metrics.has_key('date_listed'),
-            # ✅ FIX: jsonb_typeof으로 타입 확인 후 안전하게 추출
-            or_(
-                # JSONB 값이 문자열인 경우
-                and_(
-                    func.jsonb_typeof(Listing.metrics['date_listed']) == 'string',
-                    Listing.metrics['date_listed'].astext.isnot(None),
-                    cast(Listing.metrics['date_listed'].astext, Date) < cutoff_date
-                ),
-                # JSONB 값이 숫자(타임스탬프)인 경우
-                and_(
-                    func.jsonb_typeof(Listing.metrics['date_listed']) == 'number',
-                    Listing.metrics['date_listed'].astext.isnot(None),
-                    cast(
-                        func.to_timestamp(cast(Listing.metrics['date_listed'].astext, Integer)),
-                        Date
-                    ) < cutoff_date
-                )
-            )
-        )
-    )
-    
-    # Add fallback to date_listed if column exists (legacy support)
-    date_filters.append(
-        and_(
-            or_(
-                Listing.metrics == None,
-                ~Listing.metrics.has_key('date_listed')
-            ),
-            Listing.date_listed.isnot(None),
-            Listing.date_listed < cutoff_date
-        )
-    )
-    
-    # Add last_synced_at as final fallback
-    date_filters.append(
-        and_(
-            or_(
-                Listing.metrics == None,
-                ~Listing.metrics.has_key('date_listed')
-            ),
-            or_(
-                Listing.date_listed == None,
-                Listing.date_listed.is_(None)
-            ),
-            Listing.last_synced_at.isnot(None),
-            func.date(Listing.last_synced_at) < cutoff_date
-        )
-    )
-    
-    # 날짜 필터가 하나라도 있으면 적용
-    if date_filters:
-        query = query.filter(or_(*date_filters))
+    # (prebuilt at import; only the cutoff is bound per call)
+    query = query.filter(_ZOMBIE_DATE_FILTER).params(cutoff_date=cutoff_date)
     
     # Sales filter: use metrics['sales'] (JSONB) with robust casting
-    # ✅ FIX: JSONB 연산자 안전하게 처리 및 타입 검증 추가
     if max_sales is not None and max_sales >= 0:
-        # Use CASE to safely handle NULL metrics or missing keys
-        # ✅ FIX: hasattr 제거, 타입 검증 추가 및 안전한 캐스팅
-        sales_value = case(
-            (
-                and_(
-                    Listing.metrics.isnot(None),
-                    Listing.metrics.has_key('sales'),
-                    # ✅ FIX: JSONB 값이 숫자 또는 문자열인지 확인
-                    func.jsonb_typeof(Listing.metrics['sales']).in_(['number', 'string']),
-                    # ✅ FIX: NULL 체크 추가
-                    Listing.metrics['sales'].astext.isnot(None)
-                ),
-                # ✅ FIX: 안전한 타입 변환 (JSONB ->> 텍스트 추출 후 Integer로 변환)
-                cast(
-                    Listing.metrics['sales'].astext,
-                    Integer
-                )
-            ),
-            else_=0
-        )
-        query = query.filter(sales_value <= max_sales)
+        query = query.filter(_ZOMBIE_SALES <= max_sales)
     
     # 3. Watch/찜하기 필터: metrics['watches'] or metrics['watches']['total_watches']
     if effective_max_watches is not None and effective_max_watches >= 0:
-        watches_value = case(
-            # Try nested structure first: metrics['watches']['total_watches']
-            (
-                and_(
-                    Listing.metrics.isnot(None),
-                    Listing.metrics.has_key('watches'),
-                    func.jsonb_typeof(Listing.metrics['watches']) == 'object',
-                    Listing.metrics['watches'].has_key('total_watches')
-                ),
-                cast(Listing.metrics['watches']['total_watches'].astext, Integer)
-            ),
-            # Then try flat structure: metrics['watches']
-            (
-                and_(
-                    Listing.metrics.isnot(None),
-                    Listing.metrics.has_key('watches'),
-                    func.jsonb_typeof(Listing.metrics['watches']).in_(['number', 'string']),
-                    Listing.metrics['watches'].astext.isnot(None)
-                ),
-                cast(Listing.metrics['watches'].astext, Integer)
-            ),
-            # Fallback to legacy watch_count column
-            else_=func.coalesce(Listing.watch_count, 0)
-        )
-        query = query.filter(watches_value <= effective_max_watches)
+        query = query.filter(_ZOMBIE_WATCHES <= effective_max_watches)
     
     # 4. Impressions/노출 필터: metrics['impressions'] or metrics['impressions']['total_impressions']
     if max_impressions is not None and max_impressions > 0:
-        impressions_value = case(
-            # Try nested structure first
-            (
-                and_(
-                    Listing.metrics.isnot(None),
-                    Listing.metrics.has_key('impressions'),
-                    func.jsonb_typeof(Listing.metrics['impressions']) == 'object',
-                    Listing.metrics['impressions'].has_key('total_impressions')
-                ),
-                cast(Listing.metrics['impressions']['total_impressions'].astext, Integer)
-            ),
-            # Then try flat structure
-            (
-                and_(
-                    Listing.metrics.isnot(None),
-                    Listing.metrics.has_key('impressions'),
-                    func.jsonb_typeof(Listing.metrics['impressions']).in_(['number', 'string']),
-                    Listing.metrics['impressions'].astext.isnot(None)
-                ),
-                cast(Listing.metrics['impressions'].astext, Integer)
-            ),
-            else_=0
-        )
-        query = query.filter(impressions_value < max_impressions)
+        query = query.filter(_ZOMBIE_IMPRESSIONS < max_impressions)
     
     # 5. Views/조회 필터: metrics['views'] or metrics['views']['total_views']
     if max_views is not None and max_views > 0:
-        views_value = case(
-            # Try nested structure first
-            (
-                and_(
-                    Listing.metrics.isnot(None),
-                    Listing.metrics.has_key('views'),
-                    func.jsonb_typeof(Listing.metrics['views']) == 'object',
-                    Listing.metrics['views'].has_key('total_views')
-                ),
-                cast(Listing.metrics['views']['total_views'].astext, Integer)
-            ),
-            # Then try flat structure
-            (
-                and_(
-                    Listing.metrics.isnot(None),
-                    Listing.metrics.has_key('views'),
-                    func.jsonb_typeof(Listing.metrics['views']).in_(['number', 'string']),
-                    Listing.metrics['views'].astext.isnot(None)
-                ),
-                cast(Listing.metrics['views'].astext, Integer)
-            ),
-            else_=0
-        )
-        query = query.filter(views_value < max_views)
+        query = query.filter(_ZOMBIE_VIEWS < max_views)
     
     # Apply platform filter (MVP Scope: Only eBay and Shopify)
     # ✅ FIX: platform 필드가 없으면 marketplace 사용
     if platform_filter and platform_filter in ["eBay", "Shopify"]:
         # platform 필드가 있으면 사용, 없으면 marketplace 사용
-        if hasattr(Listing, 'platform'):
-            query = query.filter(Listing.platform == platform_filter)
-        else:
-            query = query.filter(Listing.marketplace == platform_filter)
+        query = query.filter(_PLATFORM_COLUMN == platform_filter)
     
     # Apply supplier filter if not "All"
     if supplier_filter and supplier_filter != "All":
         query = query.filter(Listing.supplier_name == supplier_filter)
     
-    # Apply pagination (skip and limit)
+    # Calculate Store-Level Breakdown in SQL: Group all matching zombies by platform
+    # ✅ FIX: platform 필드가 없으면 marketplace 사용
+    breakdown_rows = query.with_entities(
+        _ZOMBIE_PLATFORM,
+        func.count(Listing.id)
+    ).group_by(_ZOMBIE_PLATFORM).all()
+    zombie_breakdown = {platform: count for platform, count in breakdown_rows}
+    
+    # Apply pagination (keyset cursor, or skip and limit)
+    # Sort in SQL: most recently listed first (ascending age), undated listings last
     skip = max(0, skip)
     limit = min(max(1, limit), 1000)  # Clamp between 1 and 1000
-    zombies = query.offset(skip).limit(limit).all()
+    if cursor is not None:
+        # Resume right after the cursor position in (listed date DESC NULLS LAST, id) order.
+        # The cursor carries its own date, so it stays valid if that row is deleted or edited.
+        cursor_date, cursor_id = _parse_zombie_cursor(cursor)
+        if cursor_date is None:
+            # Cursor is in the undated tail: continue by id only
+            query = query.filter(_LISTED_DATE.is_(None), Listing.id > cursor_id)
+        else:
+            query = query.filter(or_(
+                _LISTED_DATE < cursor_date,
+                and_(_LISTED_DATE == cursor_date, Listing.id > cursor_id),
+                _LISTED_DATE.is_(None)
+            ))
+        skip = 0
+    rows = query.options(
+        load_only(*_ZOMBIE_LOAD_COLUMNS)
+    ).add_columns(
+        _LISTED_DATE
+    ).order_by(
+        _LISTED_DATE.desc().nulls_last(),
+        Listing.id
+    ).offset(skip).limit(limit).all()
+    zombies = [zombie for zombie, _ in rows]
+    
+    # Cursor for the next page: last row in SQL order (before the activity re-sort below)
+    next_cursor = _format_zombie_cursor(rows[-1][1], rows[-1][0].id) if len(rows) == limit else None
     
     # Get current platform(s) being analyzed
     current_platforms = set()
@@ -549,133 +668,83 @@ def analyze_zombie_listings(
             platform = getattr(z, 'platform', None) or getattr(z, 'marketplace', None) or "Unknown"
             current_platforms.add(platform)
     
-    # Cross-Platform Health Check & Activity Check: Check each zombie
-    for zombie in zombies:
-        # Check if this supplier_id is a global winner across all stores
-        is_global_winner = check_global_health(db, user_id, zombie.supplier_id)
-        
-        # Set the is_global_winner flag (safe: check if column exists)
-        if hasattr(zombie, 'is_global_winner'):
-            zombie.is_global_winner = 1 if is_global_winner else 0
-        
-        # Cross-Platform Activity Check: Check if this zombie is active elsewhere
-        is_active_elsewhere = False
-        if zombie.supplier_id:
-            # Find all other listings with the same supplier_id in OTHER platforms
-            # ✅ FIX: platform 필드가 없으면 marketplace 사용
-            zombie_platform = getattr(zombie, 'platform', None) or getattr(zombie, 'marketplace', None)
-            if hasattr(Listing, 'platform'):
-                other_listings_query = db.query(Listing).filter(
-                    Listing.user_id == user_id,
-                    Listing.supplier_id == zombie.supplier_id,
-                    Listing.platform != zombie_platform  # Different platform/store
-                )
-            else:
-                other_listings_query = db.query(Listing).filter(
-                    Listing.user_id == user_id,
-                    Listing.supplier_id == zombie.supplier_id,
-                    Listing.marketplace != zombie_platform  # Different platform/store
-                )
-            other_listings = other_listings_query.all()
-            
-            # Check if ANY of these other listings are NOT zombies (active)
-            for other_listing in other_listings:
-                # Get sales, views, and age
-                other_sales = 0
-                other_views = 0
-                other_date_listed = None
-                
-                if other_listing.metrics and isinstance(other_listing.metrics, dict):
-                    other_sales = other_listing.metrics.get('sales', 0) or 0
-                    other_views = other_listing.metrics.get('views', 0) or 0
-                    if 'date_listed' in other_listing.metrics:
-                        date_val = other_listing.metrics['date_listed']
-                        if isinstance(date_val, date):
-                            other_date_listed = date_val
-                        elif isinstance(date_val, str):
-                            try:
-                                other_date_listed = datetime.strptime(date_val, '%Y-%m-%d').date()
-                            except:
-                                pass
-                else:
-                    other_sales = getattr(other_listing, 'sold_qty', 0) or 0
-                    other_views = getattr(other_listing, 'watch_count', 0) or 0
-                    other_date_listed = getattr(other_listing, 'date_listed', None)
-                
-                # Calculate age
-                if other_date_listed:
-                    age_days = (date.today() - other_date_listed).days
-                else:
-                    # Use last_synced_at as fallback
-                    if other_listing.last_synced_at:
-                        age_days = (date.today() - other_listing.last_synced_at.date()).days
-                    else:
-                        age_days = 999  # Very old if no date
-                
-                # Check if this listing is NOT a zombie (active)
-                # Active if: Sales > 0 OR Views > 10 OR Age < 3 days
-                is_active = (
-                    other_sales > 0 or
-                    other_views > 10 or
-                    age_days < 3
-                )
-                
-                if is_active:
-                    is_active_elsewhere = True
-                    break  # Found at least one active listing elsewhere
-        
-        # Set the is_active_elsewhere flag (safe: check if column exists)
-        if hasattr(zombie, 'is_active_elsewhere'):
-            zombie.is_active_elsewhere = 1 if is_active_elsewhere else 0
-        
-        # Commit the update to database (only if columns exist)
-        try:
-            db.commit()
-        except Exception as e:
-            # If commit fails due to missing columns, rollback and continue
-            db.rollback()
-            print(f"Warning: Could not update flags (columns may not exist): {e}")
-    
-    # Sort zombies: Primary by is_active_elsewhere (DESC - True first), Secondary by age (oldest first)
-    def sort_key(z):
-        # Primary: is_active_elsewhere (True = 1, False = 0, so DESC means True comes first)
-        # Secondary: age (oldest first)
-        is_active = getattr(z, 'is_active_elsewhere', 0)
-        
-        # Calculate age for secondary sort
-        z_date_listed = None
-        if z.metrics and isinstance(z.metrics, dict) and 'date_listed' in z.metrics:
-            date_val = z.metrics['date_listed']
-            if isinstance(date_val, date):
-                z_date_listed = date_val
-            elif isinstance(date_val, str):
-                try:
-                    z_date_listed = datetime.strptime(date_val, '%Y-%m-%d').date()
-                except:
-                    pass
-        if not z_date_listed:
-            z_date_listed = getattr(z, 'date_listed', None)
-        if not z_date_listed and z.last_synced_at:
-            z_date_listed = z.last_synced_at.date()
-        
-        age_days = (date.today() - z_date_listed).days if z_date_listed else 999
-        
-        # Return tuple: (negative is_active for DESC, age_days for ASC)
-        return (-is_active, age_days)
+    # Cross-platform flags (global winner / active elsewhere), only when Listing maps a flag
+    # column; otherwise nothing reads the grouped supplier aggregate
+    if _HAS_ZOMBIE_FLAGS:
+        _apply_zombie_flags(db, user_id, zombies)
     
-    zombies = sorted(zombies, key=sort_key)
-    
-    # Calculate Store-Level Breakdown: Group zombies by platform
-    zombie_breakdown = {}
-    for zombie in zombies:
+    return zombies, zombie_breakdown, next_cursor
+
+
+# Rows per INSERT ... ON CONFLICT statement in upsert_listings
+UPSERT_CHUNK_SIZE = 2000
+
+# Listing attributes copied verbatim into the UPSERT row, and the ones that need a
+# fallback/default; attrgetter fetches each group in a single C-level call per listing
+_UPSERT_COPY_FIELDS = (
+    'title', 'image_url', 'sku', 'supplier_name', 'supplier_id', 'brand', 'upc',
+    'price', 'date_listed',
+)
+_upsert_copied = attrgetter(*_UPSERT_COPY_FIELDS)
+_upsert_defaulted = attrgetter(
+    'user_id', 'platform', 'marketplace', 'item_id', 'ebay_item_id',
+    'metrics', 'last_synced_at', 'sold_qty', 'watch_count',
+)
+
+# SQLite caps bound parameters per statement (32766), so its chunks stay smaller
+SQLITE_UPSERT_CHUNK_SIZE = 500
+# NOT NULL columns written on INSERT only (never overwritten by the conflict update)
+_UPSERT_INSERT_ONLY = frozenset(('ebay_item_id', 'source'))
+
+
+def _chunks(seq, size: int):
+    """Yield successive slices of at most `size` items from a sequence"""
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _upsert_values(listings: List[Listing], now: datetime) -> List[Dict]:
+    """Convert Listing objects to UPSERT row dictionaries (shared by both dialects)"""
+    values_list = []
+    for listing in listings:
+        values = dict(zip(_UPSERT_COPY_FIELDS, _upsert_copied(listing)))
+        (user_id, platform, marketplace, item_id, ebay_item_id,
+         metrics, last_synced_at, sold_qty, watch_count) = _upsert_defaulted(listing)
+        values['user_id'] = user_id or "default-user"
         # ✅ FIX: platform 필드가 없으면 marketplace 사용
-        platform = getattr(zombie, 'platform', None) or getattr(zombie, 'marketplace', None) or "Unknown"
-        zombie_breakdown[platform] = zombie_breakdown.get(platform, 0) + 1
+        values['platform'] = platform or marketplace or "eBay"
+        # ✅ FIX: item_id 필드가 없으면 ebay_item_id 사용
+        values['item_id'] = item_id or ebay_item_id or ""
+        values['metrics'] = metrics or {}
+        values['raw_data'] = getattr(listing, 'raw_data', None) or {}
+        values['last_synced_at'] = last_synced_at or now
+        values['updated_at'] = now
+        # Legacy fields
+        values['sold_qty'] = sold_qty if sold_qty is not None else 0
+        values['watch_count'] = watch_count if watch_count is not None else 0
+        values_list.append(values)
+    return values_list
+
+
+def _upsert_table_rows(listings: List[Listing], now: datetime, table, conflict_columns) -> List[Dict]:
+    """
+    UPSERT rows restricted to the columns `table` actually has, plus the insert-only ones,
+    one row per conflict key (last occurrence wins, same result as upserting in order)
     
-    return zombies, zombie_breakdown
+    Duplicates would make PostgreSQL reject a chunk ("ON CONFLICT DO UPDATE command cannot
+    affect row a second time") and report a key repeated across chunks as both inserted and updated.
+    """
+    rows = {}
+    for listing, values in zip(listings, _upsert_values(listings, now)):
+        # raw_data / updated_at are not Listing columns
+        row = {key: value for key, value in values.items() if key in table.c}
+        row['ebay_item_id'] = listing.ebay_item_id or values['item_id']
+        row['source'] = listing.source
+        rows[tuple(row[key] for key in conflict_columns)] = row
+    return list(rows.values())
 
 
-def upsert_listings(db: Session, listings: List[Listing]) -> int:
+def upsert_listings(db: Session, listings: List[Listing]) -> Tuple[List[int], List[int]]:
     """
     UPSERT listings using PostgreSQL's ON CONFLICT DO UPDATE.
     
@@ -683,18 +752,19 @@ def upsert_listings(db: Session, listings: List[Listing]) -> int:
     instead of raising IntegrityError. Uses the unique index 'idx_user_platform_item'
     which is on (user_id, platform, item_id).
     
-    For PostgreSQL: Uses INSERT ... ON CONFLICT DO UPDATE
-    For SQLite: Falls back to individual INSERT OR REPLACE (less efficient but compatible)
+    For PostgreSQL: Uses INSERT ... ON CONFLICT DO UPDATE, in chunks of UPSERT_CHUNK_SIZE rows
+    For SQLite: Uses SQLite's ON CONFLICT DO UPDATE, in chunks of SQLITE_UPSERT_CHUNK_SIZE rows
     
     Args:
         db: Database session
         listings: List of Listing objects to upsert
         
     Returns:
-        Number of listings processed
+        Tuple of (inserted_ids, updated_ids) - row IDs split by whether the
+        listing was newly inserted or updated in place
     """
     if not listings:
-        return 0
+        return [], []
     
     # Check if we're using PostgreSQL (has insert().on_conflict_do_update)
     # or SQLite (needs different approach)
@@ -703,130 +773,87 @@ def upsert_listings(db: Session, listings: List[Listing]) -> int:
     
     is_postgresql = engine.dialect.name == 'postgresql'
     
+    # One timestamp for the whole batch (consistent updated_at across rows)
+    now = datetime.utcnow()
+    
+    inserted_ids = []
+    updated_ids = []
+    
+    # ✅ FIX: platform 필드가 없으면 marketplace 사용, item_id가 없으면 ebay_item_id 사용
+    conflict_columns = ['user_id', _PLATFORM_COLUMN.key, _ITEM_ID_COLUMN.key]
+    
     if is_postgresql:
         # PostgreSQL: Use bulk INSERT ... ON CONFLICT DO UPDATE
         table = Listing.__table__
         
         # Prepare data dictionaries for bulk insert
-        values_list = []
-        for listing in listings:
-            # Convert Listing object to dictionary
-            # ✅ FIX: platform 필드가 없으면 marketplace 사용
-            platform = getattr(listing, 'platform', None) or getattr(listing, 'marketplace', None) or "eBay"
-            # ✅ FIX: item_id 필드가 없으면 ebay_item_id 사용
-            item_id = getattr(listing, 'item_id', None) or getattr(listing, 'ebay_item_id', None) or ""
-            
-            values = {
-                'user_id': getattr(listing, 'user_id', None) or "default-user",
-                'platform': platform,
-                'item_id': item_id,
-                'title': listing.title,
-                'image_url': listing.image_url,
-                'sku': listing.sku,
-                'supplier_name': listing.supplier_name,
-                'supplier_id': listing.supplier_id,
-                'brand': listing.brand,
-                'upc': listing.upc,
-                'metrics': listing.metrics if listing.metrics else {},
-                'raw_data': listing.raw_data if listing.raw_data else {},
-                'last_synced_at': listing.last_synced_at if listing.last_synced_at else datetime.utcnow(),
-                'updated_at': datetime.utcnow(),
-                # Legacy fields
-                'price': listing.price,
-                'date_listed': listing.date_listed,
-                'sold_qty': listing.sold_qty if listing.sold_qty is not None else 0,
-                'watch_count': listing.watch_count if listing.watch_count is not None else 0,
-            }
-            values_list.append(values)
-        
-        # Use PostgreSQL's INSERT ... ON CONFLICT DO UPDATE
-        stmt = insert(table).values(values_list)
+        values_list = _upsert_table_rows(listings, now, table, conflict_columns)
         
-        # On conflict, update these fields (but preserve created_at)
-        # Use excluded table reference for PostgreSQL ON CONFLICT
-        # ✅ FIX: platform 필드가 없으면 marketplace 사용, item_id가 없으면 ebay_item_id 사용
-        conflict_columns = ['user_id']
-        if hasattr(Listing, 'platform'):
-            conflict_columns.append('platform')
-        elif hasattr(Listing, 'marketplace'):
-            conflict_columns.append('marketplace')
-        if hasattr(Listing, 'item_id'):
-            conflict_columns.append('item_id')
-        elif hasattr(Listing, 'ebay_item_id'):
-            conflict_columns.append('ebay_item_id')
+        # On conflict, update every written column except the conflict key and the
+        # insert-only ones (created_at is never written, so it is preserved)
+        update_keys = [
+            key for key in values_list[0]
+            if key not in conflict_columns and key not in _UPSERT_INSERT_ONLY
+        ]
         
-        excluded = stmt.excluded
-        stmt = stmt.on_conflict_do_update(
-            index_elements=conflict_columns,
-            set_={
-                'title': excluded.title,
-                'image_url': excluded.image_url,
-                'sku': excluded.sku,
-                'supplier_name': excluded.supplier_name,
-                'supplier_id': excluded.supplier_id,
-                'brand': excluded.brand,
-                'upc': excluded.upc,
-                'metrics': excluded.metrics,
-                'raw_data': excluded.raw_data,
-                'last_synced_at': excluded.last_synced_at,
-                'updated_at': datetime.utcnow(),
-                # Legacy fields
-                'price': excluded.price,
-                'date_listed': excluded.date_listed,
-                'sold_qty': excluded.sold_qty,
-                'watch_count': excluded.watch_count,
-            }
-        )
+        # Use PostgreSQL's INSERT ... ON CONFLICT DO UPDATE
+        # Execute in fixed-size chunks so a full sync never builds one giant
+        # statement; all chunks share a single transaction (one commit below)
+        for chunk in _chunks(values_list, UPSERT_CHUNK_SIZE):
+            stmt = insert(table).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={key: stmt.excluded[key] for key in update_keys}
+            ).returning(
+                table.c.id,
+                # xmax = 0 only for rows this statement inserted (updated rows carry our xid)
+                (literal_column('xmax') == 0).label('inserted')
+            )
+            for row_id, inserted in db.execute(stmt):
+                (inserted_ids if inserted else updated_ids).append(row_id)
         
-        # Execute the statement
-        db.execute(stmt)
         db.commit()
     else:
-        # SQLite: Use individual INSERT OR REPLACE (less efficient but compatible)
-        for listing in listings:
-            # ✅ FIX: platform 필드가 없으면 marketplace 사용, item_id가 없으면 ebay_item_id 사용
-            platform = getattr(listing, 'platform', None) or getattr(listing, 'marketplace', None) or "eBay"
-            item_id = getattr(listing, 'item_id', None) or getattr(listing, 'ebay_item_id', None) or ""
-            user_id = getattr(listing, 'user_id', None) or "default-user"
-            
-            # Check if listing exists
-            query = db.query(Listing).filter(Listing.user_id == user_id)
-            if hasattr(Listing, 'platform'):
-                query = query.filter(Listing.platform == platform)
-            elif hasattr(Listing, 'marketplace'):
-                query = query.filter(Listing.marketplace == platform)
-            if hasattr(Listing, 'item_id'):
-                query = query.filter(Listing.item_id == item_id)
-            elif hasattr(Listing, 'ebay_item_id'):
-                query = query.filter(Listing.ebay_item_id == item_id)
-            
-            existing = query.first()
-            
-            if existing:
-                # Update existing record
-                existing.title = listing.title
-                existing.image_url = listing.image_url
-                existing.sku = listing.sku
-                existing.supplier_name = listing.supplier_name
-                existing.supplier_id = listing.supplier_id
-                existing.brand = listing.brand
-                existing.upc = listing.upc
-                existing.metrics = listing.metrics if listing.metrics else {}
-                existing.raw_data = listing.raw_data if listing.raw_data else {}
-                existing.last_synced_at = listing.last_synced_at if listing.last_synced_at else datetime.utcnow()
-                existing.updated_at = datetime.utcnow()
-                existing.price = listing.price
-                existing.date_listed = listing.date_listed
-                existing.sold_qty = listing.sold_qty if listing.sold_qty is not None else 0
-                existing.watch_count = listing.watch_count if listing.watch_count is not None else 0
-            else:
-                # Insert new record
-                listing.updated_at = datetime.utcnow()
-                db.add(listing)
+        # SQLite (3.35+ for RETURNING): the same INSERT ... ON CONFLICT DO UPDATE, on the
+        # unique idx_user_platform_item index declared on Listing
+        table = Listing.__table__
+        values_list = _upsert_table_rows(listings, now, table, conflict_columns)
+        
+        update_keys = [
+            key for key in values_list[0]
+            if key not in conflict_columns and key not in _UPSERT_INSERT_ONLY
+        ]
+        
+        # SQLite assigns new rowids above the current maximum, so any returned id
+        # beyond it belongs to a freshly inserted row
+        max_existing_id = db.query(func.max(Listing.id)).scalar() or 0
+        
+        for chunk in _chunks(values_list, SQLITE_UPSERT_CHUNK_SIZE):
+            stmt = sqlite_insert(table).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={key: stmt.excluded[key] for key in update_keys}
+            ).returning(table.c.id)
+            for (row_id,) in db.execute(stmt):
+                (inserted_ids if row_id > max_existing_id else updated_ids).append(row_id)
         
         db.commit()
     
-    return len(listings)
+    return inserted_ids, updated_ids
+
+
+# getattr default that tells "attribute missing" apart from a stored None
+_MISSING = object()
+
+
+def _as_json_dict(value) -> Optional[Dict]:
+    """JSONB value as a dict: parses JSON strings, None for anything that isn't an object"""
+    if isinstance(value, str):
+        try:
+            value = _json_loads(value)
+        except (ValueError, TypeError):
+            return None
+    return value if isinstance(value, dict) else None
 
 
 def extract_csv_fields(listing: Listing) -> Dict[str, any]:
@@ -848,60 +875,40 @@ def extract_csv_fields(listing: Listing) -> Dict[str, any]:
     # sku
     sku = getattr(listing, 'sku', '') or ""
     
+    # metrics는 한 번만 읽어서 아래 폴백들에서 재사용
+    metrics = getattr(listing, 'metrics', None)
+    metrics_dict = metrics if isinstance(metrics, dict) else None
+    
     # is_zombie (metrics 또는 별도 필드에서)
-    is_zombie = False
-    if hasattr(listing, 'is_zombie'):
-        is_zombie = bool(getattr(listing, 'is_zombie', False))
-    elif hasattr(listing, 'metrics') and listing.metrics:
-        if isinstance(listing.metrics, dict):
-            is_zombie = listing.metrics.get('is_zombie', False)
+    is_zombie = getattr(listing, 'is_zombie', _MISSING)
+    if is_zombie is not _MISSING:
+        is_zombie = bool(is_zombie)
+    elif metrics_dict:
+        is_zombie = metrics_dict.get('is_zombie', False)
+    else:
+        is_zombie = False
     
     # zombie_score (metrics 또는 별도 필드에서)
-    zombie_score = None
-    if hasattr(listing, 'zombie_score'):
-        zombie_score = getattr(listing, 'zombie_score', None)
-    elif hasattr(listing, 'metrics') and listing.metrics:
-        if isinstance(listing.metrics, dict):
-            zombie_score = listing.metrics.get('zombie_score', None)
+    zombie_score = getattr(listing, 'zombie_score', _MISSING)
+    if zombie_score is _MISSING:
+        zombie_score = metrics_dict.get('zombie_score', None) if metrics_dict else None
     
     # analysis_meta.recommendation.action
     # ✅ FIX: JSONB 필드 안전하게 추출 (문자열 파싱 지원)
     action = None
     try:
-        if hasattr(listing, 'analysis_meta') and listing.analysis_meta:
-            analysis_meta = listing.analysis_meta
+        analysis_meta = getattr(listing, 'analysis_meta', None)
+        if analysis_meta:
+            analysis_meta = _as_json_dict(analysis_meta)
+        elif metrics:
             # JSONB가 문자열로 저장된 경우 파싱
-            if isinstance(analysis_meta, str):
-                try:
-                    analysis_meta = json.loads(analysis_meta)
-                except (json.JSONDecodeError, TypeError):
-                    analysis_meta = None
-            
-            if isinstance(analysis_meta, dict):
-                recommendation = analysis_meta.get('recommendation', {})
-                if isinstance(recommendation, dict):
-                    action = recommendation.get('action', None)
-        elif hasattr(listing, 'metrics') and listing.metrics:
-            metrics = listing.metrics
-            # JSONB가 문자열로 저장된 경우 파싱
-            if isinstance(metrics, str):
-                try:
-                    metrics = json.loads(metrics)
-                except (json.JSONDecodeError, TypeError):
-                    metrics = None
-            
-            if isinstance(metrics, dict):
-                analysis_meta = metrics.get('analysis_meta', {})
-                if isinstance(analysis_meta, str):
-                    try:
-                        analysis_meta = json.loads(analysis_meta)
-                    except (json.JSONDecodeError, TypeError):
-                        analysis_meta = None
-                
-                if isinstance(analysis_meta, dict):
-                    recommendation = analysis_meta.get('recommendation', {})
-                    if isinstance(recommendation, dict):
-                        action = recommendation.get('action', None)
+            metrics = _as_json_dict(metrics)
+            analysis_meta = _as_json_dict(metrics.get('analysis_meta', {})) if metrics else None
+        
+        if analysis_meta:
+            recommendation = analysis_meta.get('recommendation', {})
+            if isinstance(recommendation, dict):
+                action = recommendation.get('action', None)
     except Exception as e:
         # 안정성: 예외 발생 시 None 반환 (500 에러 방지)
         print(f"Warning: Failed to extract action from analysis_meta: {e}")
@@ -916,6 +923,34 @@ def extract_csv_fields(listing: Listing) -> Dict[str, any]:
     }
 
 
+# Column order of extract_csv_fields() rows
+CSV_FIELD_COLUMNS = ('external_id', 'sku', 'is_zombie', 'zombie_score', 'action')
+
+
+def export_csv_fields(listings: List[Listing]) -> str:
+    """
+    extract_csv_fields 결과를 CSV 문자열로 일괄 변환
+    
+    필드 추출을 map()으로 돌리고 csv.writer.writerows 한 번으로 직렬화 (행 단위 append 없음)
+    """
+    output = StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(CSV_FIELD_COLUMNS)
+    writer.writerows(fields.values() for fields in map(extract_csv_fields, listings))
+    return output.getvalue()
+
+
+# Static reason field and listing URL prefix of the standard zombie CSV
+_ZOMBIE_REASON = "Low Interest/Zombie Item"
+_EBAY_URL_PREFIX = "https://www.ebay.com/itm/"
+
+
+@lru_cache(maxsize=64)
+def _norm_supplier(name: Optional[str]) -> str:
+    """Supplier name as exported (upper-cased); only a handful of distinct names exist"""
+    return (name or "Unknown").upper()
+
+
 def export_zombies_to_csv(zombie_listings: List[Listing]) -> str:
     """
     Standard CSV Export Format for Zombie Listings
@@ -931,59 +966,250 @@ def export_zombies_to_csv(zombie_listings: List[Listing]) -> str:
         zombie_listings: List of Listing objects to export
         
     Returns:
-        CSV string with standard format
+        CSV string with standard format (use export_zombies_to_stream to write into a file/response)
+    """
+    output = StringIO()
+    export_zombies_to_stream(zombie_listings, output)
+    return output.getvalue()
+
+
+def export_zombies_to_stream(zombie_listings: List[Listing], out: IO[str]) -> None:
+    """
+    Write the standard zombie CSV (same columns as export_zombies_to_csv) straight into `out`
+    
+    Rows go to the caller's text stream (file, HTTP response sink, ...) as they are built,
+    so the whole CSV is never held in memory. Nothing is written for an empty list.
     """
     if not zombie_listings:
-        return ""
+        return
+    
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(("item_id", "supplier_id", "supplier_name", "reason", "listing_url"))
     
-    data = []
     for listing in zombie_listings:
-        # Extract item_id
-        item_id = listing.item_id if hasattr(listing, 'item_id') else ""
+        # Extract item_id (✅ FIX: item_id가 없으면 ebay_item_id 사용)
+        item_id = getattr(listing, 'item_id', None) or getattr(listing, 'ebay_item_id', "")
         
         # Extract supplier_id (fallback to empty string if None)
-        supplier_id = listing.supplier_id if hasattr(listing, 'supplier_id') and listing.supplier_id else ""
+        supplier_id = getattr(listing, 'supplier_id', None) or ""
         
         # Extract supplier_name (uppercase for consistency)
-        supplier_name = (listing.supplier_name if hasattr(listing, 'supplier_name') else "Unknown").upper()
+        supplier_name = _norm_supplier(getattr(listing, 'supplier_name', None))
         
-        # Generate listing_url: Try to extract from raw_data first, otherwise generate eBay URL
+        # Generate listing_url: default eBay URL (Format: https://www.ebay.com/itm/{item_id}),
+        # replaced by a URL stored in raw_data when there is one
         listing_url = ""
         if item_id:
-            # Try to get URL from raw_data if available
-            if hasattr(listing, 'raw_data') and listing.raw_data:
-                raw_data = listing.raw_data
-                if isinstance(raw_data, dict):
-                    listing_url = raw_data.get('listing_url') or raw_data.get('url') or raw_data.get('viewItemURL') or ""
-                elif isinstance(raw_data, str):
-                    try:
-                        parsed_data = json.loads(raw_data)
-                        listing_url = parsed_data.get('listing_url') or parsed_data.get('url') or parsed_data.get('viewItemURL') or ""
-                    except:
-                        pass
-            
-            # If no URL found in raw_data, generate eBay URL
-            if not listing_url:
-                # Format: https://www.ebay.com/itm/{item_id}
-                listing_url = f"https://www.ebay.com/itm/{item_id}"
+            listing_url = f"{_EBAY_URL_PREFIX}{item_id}"
+            raw_data = getattr(listing, 'raw_data', None)
+            if raw_data:
+                if type(raw_data) is str:
+                    raw_data = _load_raw_data(raw_data)
+                if type(raw_data) is dict:
+                    listing_url = raw_data.get('listing_url') or raw_data.get('url') or raw_data.get('viewItemURL') or listing_url
         
-        # Static reason field
-        reason = "Low Interest/Zombie Item"
-        
-        # Append row with columns in exact order: item_id, supplier_id, supplier_name, reason, listing_url
-        data.append({
-            "item_id": item_id,
-            "supplier_id": supplier_id,
-            "supplier_name": supplier_name,
-            "reason": reason,
-            "listing_url": listing_url
-        })
+        # Write row with columns in exact order: item_id, supplier_id, supplier_name, reason, listing_url
+        writer.writerow((item_id, supplier_id, supplier_name, _ZOMBIE_REASON, listing_url))
+
+
+# Everything generate_export_csv reads from one listing (deletion-log snapshot + CSV row)
+_ExportFields = namedtuple(
+    "_ExportFields",
+    "item_id title platform supplier_name price views sales metrics sku supplier_id handle"
+)
+
+
+def _load_raw_data(raw_data: str):
+    """Decode raw_data stored as a JSON string; malformed input becomes {}"""
+    try:
+        return _json_loads(raw_data)
+    except (ValueError, TypeError):
+        return {}
+
+
+def _export_item_id(listing):
+    """item_id of a Listing object or dictionary (ebay_item_id fallback)"""
+    if isinstance(listing, dict):
+        return listing.get("item_id") or listing.get("ebay_item_id", "")
+    return getattr(listing, 'item_id', None) or getattr(listing, 'ebay_item_id', "")
+
+
+def _extract_export_fields(listing, needs_handle: bool = False) -> _ExportFields:
+    """
+    Read a Listing object or dictionary once for both the deletion snapshot and the CSV row
     
-    # Convert to CSV using pandas (columns will be in the order they were added to dict)
-    df = pd.DataFrame(data)
-    output = StringIO()
-    df.to_csv(output, index=False)
-    return output.getvalue()
+    raw_data (and its JSON parse) is only touched when needs_handle is set; handle is None otherwise.
+    """
+    if isinstance(listing, dict):
+        get = listing.get
+        item_id = get("item_id") or get("ebay_item_id", "")
+        sku = get("sku", "")
+        metrics = m if type(m := get("metrics")) is dict else {}
+        handle = None
+        if needs_handle:
+            # Try to get handle from raw_data or use SKU as fallback
+            raw_data = get("raw_data", {})
+            if type(raw_data) is str:
+                # Parse once and keep the result on the listing so later passes read a dict
+                raw_data = listing["raw_data"] = _load_raw_data(raw_data)
+            handle = raw_data.get("handle") or sku
+        return _ExportFields(
+            item_id=item_id,
+            title=get("title", "Unknown"),
+            platform=get("platform") or get("marketplace", "eBay"),
+            supplier_name=get("supplier") or get("supplier_name") or get("source", "Unknown"),
+            price=get("price") or metrics.get("price"),
+            views=get("watch_count") or get("views") or metrics.get("views"),
+            sales=get("sold_qty") or get("sales") or metrics.get("sales"),
+            metrics=metrics,
+            sku=sku,
+            supplier_id=get("supplier_id", ""),
+            handle=handle,
+        )
+    
+    metrics = m if type(m := listing.metrics) is dict else {}
+    sku = listing.sku
+    handle = None
+    if needs_handle:
+        # Try to get handle from raw_data
+        raw_data = getattr(listing, 'raw_data', {})
+        if type(raw_data) is str:
+            raw_data = _load_raw_data(raw_data)
+        handle = raw_data.get("handle") if raw_data else sku
+    return _ExportFields(
+        item_id=getattr(listing, 'item_id', None) or getattr(listing, 'ebay_item_id', ""),
+        title=getattr(listing, 'title', "Unknown"),
+        platform=getattr(listing, 'platform', None) or getattr(listing, 'marketplace', "eBay"),
+        supplier_name=getattr(listing, 'supplier_name', "Unknown"),
+        price=getattr(listing, 'price', None) or metrics.get('price'),
+        views=getattr(listing, 'watch_count', None) or metrics.get('views'),
+        sales=getattr(listing, 'sold_qty', None) or metrics.get('sales'),
+        metrics=metrics,
+        sku=sku,
+        supplier_id=getattr(listing, 'supplier_id', None),
+        handle=handle,
+    )
+
+
+# Per-tool CSV row builders for generate_export_csv: _ExportFields -> row tuple
+# autods/yaballe use supplier_id if available, otherwise SKU (both work with automation tools)
+def _autods_row(fields):
+    return (fields.supplier_id or fields.sku, "delete")
+
+
+def _wholesale2b_row(fields):
+    return (fields.sku, "Delete")
+
+
+def _shopify_matrixify_row(fields):
+    # Shopify Matrixify/Excelify format
+    return (fields.item_id, "DELETE")
+
+
+def _shopify_tagging_row(fields):
+    # Shopify Tagging Method (users upload to tag items, then filter & delete manually)
+    return (fields.handle, "OptListing_Delete")
+
+
+def _ebay_row(fields):
+    return ("End", fields.item_id)
+
+
+def _yaballe_row(fields):
+    return (fields.supplier_id or fields.sku, "DELETE")
+
+
+# target_tool -> (CSV header row, row builder, plain_rows, needs_handle)
+# plain_rows: values are IDs/SKUs that almost never need quoting, so rows are written as
+# preformatted lines (shopify_tagging handles are free text and always go through csv.writer)
+# needs_handle: the row uses raw_data["handle"], so raw_data has to be read/parsed
+_EXPORT_TOOLS = {
+    "autods": (("Source ID", "File Action"), _autods_row, True, False),
+    "wholesale2b": (("SKU", "Action"), _wholesale2b_row, True, False),
+    "shopify_matrixify": (("ID", "Command"), _shopify_matrixify_row, True, False),
+    "shopify_tagging": (("Handle", "Tags"), _shopify_tagging_row, False, True),
+    "ebay": (("Action", "ItemID"), _ebay_row, True, False),
+    "yaballe": (("Monitor ID", "Action"), _yaballe_row, True, False),
+}
+
+_CSV_NEEDS_QUOTING = re.compile(r'[,"\r\n]').search
+
+
+def _write_plain_rows(output, writer, rows):
+    """Write 2-column rows as preformatted lines; values that need quoting fall back to csv.writer"""
+    # Hot loop: bind methods/globals to locals once
+    write = output.write
+    writerow = writer.writerow
+    needs_quoting = _CSV_NEEDS_QUOTING
+    for first, second in rows:
+        if (type(first) is str and type(second) is str
+                and not needs_quoting(first) and not needs_quoting(second)):
+            write(f"{first},{second}\n")
+        else:
+            writerow((first, second))
+
+
+# generate_export_csv default chunksize: full_sync_list rows fetched per round trip, and rows
+# written between flushes of a caller-supplied stream
+EXPORT_CHUNK_SIZE = 2000
+
+# full_sync_list mode: the only columns the export reads
+_EXPORT_LOAD_COLUMNS = (
+    Listing.id,
+    Listing.item_id,
+    Listing.ebay_item_id,
+    Listing.title,
+    Listing.sku,
+    Listing.platform,
+    Listing.marketplace,
+    Listing.supplier_id,
+    Listing.supplier_name,
+    Listing.price,
+    Listing.metrics,
+    Listing.sold_qty,
+    Listing.watch_count,
+)
+
+
+# Per-thread CSV buffer reused across generate_export_csv calls (frequent small exports);
+# dropped after an export larger than _EXPORT_BUFFER_MAX_CHARS so one huge file is not kept alive
+_EXPORT_BUFFER = threading.local()
+_EXPORT_BUFFER_MAX_CHARS = 4 * 1024 * 1024
+
+
+def _export_buffer() -> StringIO:
+    """Return this thread's reusable export buffer, emptied"""
+    buf = getattr(_EXPORT_BUFFER, "buf", None)
+    if buf is None:
+        buf = _EXPORT_BUFFER.buf = StringIO()
+    else:
+        buf.seek(0)
+        buf.truncate()
+    return buf
+
+
+def _collect_deletion_logs(records, deletion_logs: list):
+    """Pass export records through while recording a DeletionLog mapping (with snapshot) for each"""
+    append = deletion_logs.append
+    for fields in records:
+        # DeletionLog row as a plain mapping (no per-row ORM object / unit-of-work tracking),
+        # with the snapshot of the current item state built inline
+        append({
+            "item_id": fields.item_id,
+            "title": fields.title,
+            "platform": fields.platform,
+            "source": fields.supplier_name or "Unknown",
+            "snapshot": {
+                "price": fields.price,
+                "views": fields.views,
+                "sales": fields.sales,
+                "title": fields.title,
+                "supplier": fields.supplier_name,
+                "platform": fields.platform,
+                "metrics": fields.metrics
+            }
+        })
+        yield fields
 
 
 def generate_export_csv(
@@ -992,8 +1218,10 @@ def generate_export_csv(
     db: Optional[Session] = None,
     user_id: str = "default-user",
     mode: str = "delete_list",
-    store_id: Optional[str] = None
-) -> str:
+    store_id: Optional[str] = None,
+    out: Optional[IO[str]] = None,
+    chunksize: int = EXPORT_CHUNK_SIZE
+) -> Optional[str]:
     """
     CSV Export for Dropshipping Automation Tools Only
     
@@ -1015,170 +1243,98 @@ def generate_export_csv(
         user_id: User ID for deletion logging and fetching listings
         mode: Export mode - "delete_list" (default) exports items to delete, "full_sync_list" exports survivors (all items except provided list)
         store_id: Optional store ID filter for full_sync_list mode
+        out: Optional text stream to write the CSV into (file, response sink, ...)
+        chunksize: Rows per DB fetch in full_sync_list mode, and rows written between
+            out.flush() calls when writing into `out` (memory stays O(chunksize)); must be >= 1
     
     Returns:
-        CSV string in tool-specific format
+        CSV string in tool-specific format, or None when written to `out`
     
     Note: Assumes 100% of items are from supported Dropshipping Tools (no manual/direct listings).
     """
+    # Resolve the tool once, before any DB work (deletion logs are not written for an unknown tool)
+    try:
+        header, build_row, plain_rows, needs_handle = _EXPORT_TOOLS[target_tool]
+    except KeyError:
+        raise ValueError(f"Unknown target tool: {target_tool}. Supported: {', '.join(_EXPORT_TOOLS)}")
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be at least 1, got {chunksize}")
+    
     # Full Sync Mode: Export all active listings EXCEPT the provided list
     if mode == "full_sync_list" and db:
+        # Extract item IDs from the exclusion list (zombies to remove); empty IDs are dropped
+        exclusion_item_ids = frozenset(filter(None, map(_export_item_id, listings)))
+        
         # Get all active listings for this user/store
         query = db.query(Listing).filter(Listing.user_id == user_id)
         
         # Apply store filter if provided and not 'all'
         if store_id and store_id != 'all':
-            if hasattr(Listing, 'store_id'):
+            if _HAS_STORE_ID:
                 query = query.filter(Listing.store_id == store_id)
         
-        all_listings = query.all()
+        # Filter out excluded items in SQL (survivors only) - excluded rows are never loaded
+        # (item_id IS NULL rows are kept, matching the previous Python filter)
+        if exclusion_item_ids:
+            query = query.filter(or_(
+                Listing.item_id.is_(None),
+                Listing.item_id.notin_(exclusion_item_ids)
+            ))
         
-        # Extract item IDs from the exclusion list (zombies to remove)
-        exclusion_item_ids = set()
-        for listing in listings:
-            if isinstance(listing, dict):
-                item_id = listing.get("item_id") or listing.get("ebay_item_id", "")
-            else:
-                item_id = listing.item_id if hasattr(listing, 'item_id') else (listing.ebay_item_id if hasattr(listing, 'ebay_item_id') else "")
-            if item_id:
-                exclusion_item_ids.add(item_id)
-        
-        # Filter out excluded items (survivors only)
-        survivor_listings = [
-            listing for listing in all_listings
-            if listing.item_id not in exclusion_item_ids
-        ]
-        
-        # Use survivors as the export list (no deletion logging for full sync mode)
-        listings = survivor_listings
-    elif not listings:
-        return ""
+        # Use survivors as the export list (no deletion logging for full sync mode), streamed
+        # from a server-side cursor in batches instead of hydrating the whole store at once
+        survivors = iter(
+            query.options(load_only(*_EXPORT_LOAD_COLUMNS)).yield_per(chunksize)
+        )
+        first = next(survivors, None)
+        listings = () if first is None else chain((first,), survivors)
     
-    # Log deletions with snapshots BEFORE generating CSV (only for delete_list mode)
-    if db and mode == "delete_list":
-        deletion_logs = []
-        for listing in listings:
-            # Extract data for snapshot
-            if isinstance(listing, dict):
-                item_id = listing.get("item_id") or listing.get("ebay_item_id", "")
-                title = listing.get("title", "Unknown")
-                platform = listing.get("platform") or listing.get("marketplace", "eBay")
-                supplier = listing.get("supplier") or listing.get("supplier_name") or listing.get("source", "Unknown")
-                price = listing.get("price") or (listing.get("metrics", {}).get("price") if isinstance(listing.get("metrics"), dict) else None)
-                views = listing.get("watch_count") or listing.get("views") or (listing.get("metrics", {}).get("views") if isinstance(listing.get("metrics"), dict) else None)
-                sales = listing.get("sold_qty") or listing.get("sales") or (listing.get("metrics", {}).get("sales") if isinstance(listing.get("metrics"), dict) else None)
-                metrics = listing.get("metrics", {}) if isinstance(listing.get("metrics"), dict) else {}
-            else:
-                item_id = listing.item_id if hasattr(listing, 'item_id') else (listing.ebay_item_id if hasattr(listing, 'ebay_item_id') else "")
-                title = listing.title if hasattr(listing, 'title') else "Unknown"
-                platform = listing.platform if hasattr(listing, 'platform') else (listing.marketplace if hasattr(listing, 'marketplace') else "eBay")
-                supplier = listing.supplier_name if hasattr(listing, 'supplier_name') else "Unknown"
-                price = getattr(listing, 'price', None) or (listing.metrics.get('price') if listing.metrics and isinstance(listing.metrics, dict) else None)
-                views = getattr(listing, 'watch_count', None) or (listing.metrics.get('views') if listing.metrics and isinstance(listing.metrics, dict) else None)
-                sales = getattr(listing, 'sold_qty', None) or (listing.metrics.get('sales') if listing.metrics and isinstance(listing.metrics, dict) else None)
-                metrics = listing.metrics if listing.metrics and isinstance(listing.metrics, dict) else {}
-            
-            # Create snapshot with current item state
-            snapshot = {
-                "price": price,
-                "views": views,
-                "sales": sales,
-                "title": title,
-                "supplier": supplier,
-                "platform": platform,
-                "metrics": metrics
-            }
-            
-            # Create DeletionLog entry with snapshot
-            log_entry = DeletionLog(
-                item_id=item_id,
-                title=title,
-                platform=platform,
-                supplier=supplier,
-                snapshot=snapshot
-            )
-            deletion_logs.append(log_entry)
-        
-        # Bulk insert deletion logs
-        if deletion_logs:
-            db.add_all(deletion_logs)
-            db.commit()
+    # Nothing to export (empty delete list, or no survivors in full sync): skip the buffer and DB work
+    if not listings:
+        return "" if out is None else None
     
-    data = []
+    # Write rows straight into the caller's stream, or a reused in-memory buffer (no intermediate DataFrame)
+    output = _export_buffer() if out is None else out
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(header)
     
-    for listing in listings:
-        # Handle both Listing objects and dictionaries
-        if isinstance(listing, dict):
-            item_id = listing.get("item_id") or listing.get("ebay_item_id", "")
-            sku = listing.get("sku", "")
-            supplier_id = listing.get("supplier_id", "")
-            supplier_name = listing.get("supplier_name") or listing.get("supplier", "") or "Unknown"
-            platform = listing.get("platform", "")
-            # Try to get handle from raw_data or use SKU as fallback
-            raw_data = listing.get("raw_data", {})
-            if isinstance(raw_data, str):
-                try:
-                    raw_data = json.loads(raw_data)
-                except:
-                    raw_data = {}
-            handle = raw_data.get("handle") or sku
-        else:
-            item_id = listing.item_id if hasattr(listing, 'item_id') else (listing.ebay_item_id if hasattr(listing, 'ebay_item_id') else "")
-            sku = listing.sku
-            supplier_id = listing.supplier_id if hasattr(listing, 'supplier_id') else None
-            supplier_name = listing.supplier_name if hasattr(listing, 'supplier_name') else (listing.supplier if hasattr(listing, 'supplier') else "Unknown")
-            platform = listing.platform if hasattr(listing, 'platform') else (listing.marketplace if hasattr(listing, 'marketplace') else "")
-            # Try to get handle from raw_data
-            raw_data = listing.raw_data if hasattr(listing, 'raw_data') else {}
-            if isinstance(raw_data, str):
-                try:
-                    raw_data = json.loads(raw_data)
-                except:
-                    raw_data = {}
-            handle = raw_data.get("handle") if raw_data else sku
-        
-        # Use supplier_id if available, otherwise use SKU (both work with automation tools)
-        effective_supplier_id = supplier_id if supplier_id else sku
-        
-        if target_tool == "autods":
-            data.append({
-                "Source ID": effective_supplier_id,
-                "File Action": "delete"
-            })
-        elif target_tool == "wholesale2b":
-            data.append({
-                "SKU": sku,
-                "Action": "Delete"
-            })
-        elif target_tool == "shopify_matrixify":
-            # Shopify Matrixify/Excelify format
-            data.append({
-                "ID": item_id,
-                "Command": "DELETE"
-            })
-        elif target_tool == "shopify_tagging":
-            # Shopify Tagging Method (users upload to tag items, then filter & delete manually)
-            data.append({
-                "Handle": handle,
-                "Tags": "OptListing_Delete"
-            })
-        elif target_tool == "ebay":
-            data.append({
-                "Action": "End",
-                "ItemID": item_id
-            })
-        elif target_tool == "yaballe":
-            data.append({
-                "Monitor ID": effective_supplier_id,
-                "Action": "DELETE"
-            })
-        else:
-            raise ValueError(f"Unknown target tool: {target_tool}. Supported: autods, wholesale2b, shopify_matrixify, shopify_tagging, ebay, yaballe")
+    # Read each listing exactly once (raw_data only for tools that export the handle)
+    records = map(_extract_export_fields, listings, repeat(needs_handle))
+    
+    # delete_list mode: the deletion-log snapshot is built in the same pass as the CSV row
+    deletion_logs = []
+    if db and mode == "delete_list":
+        records = _collect_deletion_logs(records, deletion_logs)
     
-    df = pd.DataFrame(data)
+    rows = map(build_row, records)
+    if plain_rows:
+        write_rows = partial(_write_plain_rows, output, writer)
+    else:
+        # writerows over a generator/batch: the csv writer iterates the rows itself
+        write_rows = writer.writerows
     
-    # Convert to CSV string
-    output = StringIO()
-    df.to_csv(output, index=False)
-    return output.getvalue()
+    flush = getattr(out, "flush", None)
+    if flush is None:
+        write_rows(rows)
+    else:
+        # Caller's stream: hand over every `chunksize` rows so large exports don't pile up in its buffer
+        while batch := list(islice(rows, chunksize)):
+            write_rows(batch)
+            flush()
+    
+    # Log deletions with snapshots before the CSV is handed back
+    if deletion_logs:
+        try:
+            db.bulk_insert_mappings(DeletionLog, deletion_logs)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    if out is None:
+        csv_content = output.getvalue()
+        if output.tell() > _EXPORT_BUFFER_MAX_CHARS:
+            _EXPORT_BUFFER.buf = None
+        return csv_content
+    return None
 
@@ -0,0 +1,55 @@
+from datetime import date
+from io import StringIO
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Base, DeletionLog, Listing
+from backend.services import generate_export_csv
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _listing(item_id: str, supplier_name=None) -> Listing:
+    return Listing(
+        ebay_item_id=item_id,
+        item_id=item_id,
+        title=f"Item {item_id}",
+        sku=f"AMZ-{item_id}",
+        image_url="",
+        source="Amazon",
+        price=9.99,
+        date_listed=date(2024, 1, 1),
+        platform="eBay",
+        supplier_name=supplier_name,
+        metrics={"sales": 0, "views": 3},
+    )
+
+
+def test_delete_list_export_logs_deletions(db):
+    listings = [_listing("1", "Amazon"), _listing("2")]
+    
+    csv_content = generate_export_csv(listings, "autods", db=db, user_id="u1")
+    
+    assert csv_content.splitlines()[1:] == ["AMZ-1,delete", "AMZ-2,delete"]
+    logs = db.query(DeletionLog).order_by(DeletionLog.item_id).all()
+    assert [(log.item_id, log.source) for log in logs] == [("1", "Amazon"), ("2", "Unknown")]
+    assert logs[0].snapshot["metrics"] == {"sales": 0, "views": 3}
+    assert logs[0].snapshot["price"] == 9.99
+
+
+def test_delete_list_export_into_stream(db):
+    out = StringIO()
+    
+    assert generate_export_csv([_listing("1", "Amazon")], "autods", db=db, out=out, chunksize=1) is None
+    
+    assert out.getvalue().splitlines()[0] == "Source ID,File Action"
+    assert db.query(DeletionLog).count() == 1
@@ -0,0 +1,51 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models, services
+from backend.models import Base, Listing
+from backend.services import upsert_listings
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    # upsert_listings picks its dialect from models.engine
+    monkeypatch.setattr(models, "engine", engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _listing(item_id: str, title: str = "Item") -> Listing:
+    return Listing(
+        ebay_item_id=f"e{item_id}",
+        item_id=item_id,
+        title=title,
+        sku=f"AMZ-{item_id}",
+        image_url="",
+        source="Amazon",
+        price=1.0,
+        date_listed=date(2024, 1, 1),
+        user_id="u1",
+        platform="eBay",
+    )
+
+
+def test_upsert_splits_inserted_and_updated(db, monkeypatch):
+    monkeypatch.setattr(services, "SQLITE_UPSERT_CHUNK_SIZE", 2)
+    inserted, _ = upsert_listings(db, [_listing("1"), _listing("2")])
+    
+    # "3" repeats in a later chunk of the same call: reported once, last value stored
+    inserted_2, updated_2 = upsert_listings(
+        db, [_listing("2", "x"), _listing("3"), _listing("4"), _listing("3", "y")]
+    )
+    
+    assert len(inserted) == 2
+    assert updated_2 == [inserted[1]]
+    assert len(inserted_2) == 2
+    titles = dict(db.query(Listing.item_id, Listing.title))
+    assert titles == {"1": "Item", "2": "x", "3": "y", "4": "Item"}